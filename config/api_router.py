@@ -14,10 +14,5 @@ router.register("phone", PhoneNumberViewSet, basename="phone-numbers")
 router.register("credit", CreditRequestViewSet, basename="credit-requests")
 router.register("charge", ChargeSaleViewSet, basename="charge-sales")
 
-# Add tags for API grouping
-PhoneNumberViewSet.__doc__ = "Phone number management"
-CreditRequestViewSet.__doc__ = "Credit request management"
-ChargeSaleViewSet.__doc__ = "Charge sale management"
-
 app_name = "api"
 urlpatterns = router.urls
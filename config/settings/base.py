@@ -47,6 +47,27 @@ LOCALE_PATHS = [str(BASE_DIR / "locale")]
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 DATABASES = {"default": env.db("DATABASE_URL")}
 DATABASES["default"]["ATOMIC_REQUESTS"] = False
+# https://docs.djangoproject.com/en/dev/ref/settings/#conn-max-age
+# 0 by default: connections close when the request or charge pool call that
+# opened them ends, and pooling is left to pgbouncer (see the README and
+# DJANGO_DISABLE_SERVER_SIDE_CURSORS below). Under ASGI each in-flight request
+# gets its own thread-sensitive thread and connection, which is discarded at
+# request end, so persistence mostly helps the CHARGE_DB_THREADS pool. Raising
+# it without pgbouncer costs up to
+# workers * (concurrent requests + CHARGE_DB_THREADS) connections per host.
+DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=0)
+# https://docs.djangoproject.com/en/dev/ref/settings/#conn-health-checks
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+# Set when connecting through a transaction-pooling pgbouncer, which can't keep
+# the server-side cursors that aiterator() opens alive across transactions.
+# https://docs.djangoproject.com/en/dev/ref/databases/#transaction-pooling-server-side-cursors
+DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = env.bool(
+    "DJANGO_DISABLE_SERVER_SIDE_CURSORS",
+    default=False,
+)
+# Threads in the tbdl.charge.db pool that runs the charge APIs' sync database
+# helpers; bounds how many connections that pool opens per worker process.
+CHARGE_DB_THREADS = env.int("CHARGE_DB_THREADS", default=4)
 # https://docs.djangoproject.com/en/stable/ref/settings/#std:setting-DEFAULT_AUTO_FIELD
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -56,6 +77,10 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 ROOT_URLCONF = "config.urls"
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = "config.wsgi.application"
+# Served by gunicorn with uvicorn workers (see compose/*/django/start); the API
+# views are async, so config.asgi is the entry point outside of tests.
+# https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
+ASGI_APPLICATION = "config.asgi.application"
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -291,7 +316,7 @@ SOCIALACCOUNT_FORMS = {"signup": "tbdl.users.forms.UserSocialSignupForm"}
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+        "tbdl.charge.auth.CachedTokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
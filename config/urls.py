@@ -11,6 +11,7 @@ from drf_spectacular.views import SpectacularAPIView
 from drf_spectacular.views import SpectacularSwaggerView
 from rest_framework.authtoken.views import obtain_auth_token
 from ninja import NinjaAPI
+from tbdl.charge.api.renderers import MsgspecRenderer
 from tbdl.charge.api.router import router as charge_router
 
 
@@ -18,6 +19,7 @@ api = NinjaAPI(
     title="Tabdeal Task",
     version="1.0.0",
     description="Tabdeal Task API",
+    renderer=MsgspecRenderer(),
 )
 api.add_router(router=charge_router, prefix="charge/")
 
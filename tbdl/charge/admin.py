@@ -5,5 +5,15 @@ from .models import CreditRequest
 from .models import PhoneNumber
 
 admin.site.register(PhoneNumber)
-admin.site.register(CreditRequest)
-admin.site.register(ChargeSale)
+
+
+@admin.register(CreditRequest)
+class CreditRequestAdmin(admin.ModelAdmin):
+    # __str__ renders the user, so join it instead of loading it per row.
+    list_select_related = ["user"]
+
+
+@admin.register(ChargeSale)
+class ChargeSaleAdmin(admin.ModelAdmin):
+    # __str__ renders the user and the phone number.
+    list_select_related = ["user", "phone_number"]
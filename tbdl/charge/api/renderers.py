@@ -0,0 +1,39 @@
+"""msgspec-backed JSON renderers for the ninja and DRF APIs.
+
+Datetimes keep their full microsecond precision, e.g.
+``2026-10-15T06:58:43.741578Z``. DjangoJSONEncoder, which these replace,
+truncated them to milliseconds (``2026-10-15T06:58:43.741Z``).
+"""
+
+import msgspec
+from ninja.renderers import BaseRenderer
+from pydantic import BaseModel
+from rest_framework.renderers import JSONRenderer
+
+
+def _enc_hook(obj):
+    # Mirrors NinjaJSONEncoder for the types msgspec doesn't know natively:
+    # nested schemas, lazy translation strings, URLs and the like.
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return str(obj)
+
+
+_encoder = msgspec.json.Encoder(enc_hook=_enc_hook)
+
+
+class MsgspecRenderer(BaseRenderer):
+    media_type = "application/json"
+
+    def render(self, request, data, *, response_status):
+        return _encoder.encode(data)
+
+
+class MsgspecJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Indented output (?indent=, the browsable API) keeps the stock path.
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return _encoder.encode(data)
@@ -1,17 +1,29 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
 from datetime import datetime
 
-from asgiref.sync import sync_to_async
-from django.db import models
+import msgspec
+from django.db import connection
 from django.db import transaction
 from django.db.models import F
+from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from ninja import Router
 from ninja import Schema
 from ninja.security import HttpBearer
 from pydantic import Field
 from rest_framework.authtoken.models import Token
 
+from tbdl.charge.api.structs import ChargeSaleStruct
+from tbdl.charge.api.structs import CreditRequestStruct
+from tbdl.charge.api.structs import PhoneNumberDetailStruct
+from tbdl.charge.api.structs import PhoneNumberStruct
+from tbdl.charge.cache import cached_token
+from tbdl.charge.cache import remember_token
+from tbdl.charge.db import database_sync_to_async
+from tbdl.charge.db import transaction_totals
+from tbdl.charge.db import user_transaction_totals
 from tbdl.charge.models import ChargeSale
 from tbdl.charge.models import CreditRequest
 from tbdl.charge.models import PhoneNumber
@@ -19,6 +31,54 @@ from tbdl.users.models import User
 
 logger = logging.getLogger(__name__)
 
+_encoder = msgspec.json.Encoder()
+
+
+def _json_response(payload):
+    # ninja passes HttpResponse through untouched, so the `response=` schemas
+    # below only feed the OpenAPI docs for these endpoints.
+    return HttpResponse(_encoder.encode(payload), content_type="application/json")
+
+
+_STREAM_CHUNK_SIZE = 500
+
+
+async def _json_array_chunks(rows, struct):
+    # Encode one fetch chunk at a time so memory is bounded by the chunk size
+    # rather than the length of the user's history. The 200 and the opening
+    # bracket are already sent when this runs, so a failure here can only cut
+    # the body short; log it so the truncated JSON is traceable.
+    try:
+        yield b"["
+        separator = b""
+        batch = []
+        async for row in rows.aiterator(chunk_size=_STREAM_CHUNK_SIZE):
+            batch.append(struct(**row))
+            if len(batch) == _STREAM_CHUNK_SIZE:
+                yield separator + _encoder.encode(batch)[1:-1]
+                separator = b","
+                batch = []
+        if batch:
+            yield separator + _encoder.encode(batch)[1:-1]
+        yield b"]"
+    except Exception:
+        logger.exception("Streaming %s rows failed mid-response", struct.__name__)
+        raise
+
+
+async def _json_list_response(rows, struct):
+    # Up to one chunk is fetched and sent as a plain response, so most
+    # listings keep a real error status and need no async iteration. Longer
+    # histories stream, which needs an ASGI server: under WSGI Django drains
+    # the async iterator into memory first.
+    head = [struct(**row) async for row in rows[: _STREAM_CHUNK_SIZE + 1]]
+    if len(head) <= _STREAM_CHUNK_SIZE:
+        return _json_response(head)
+    return StreamingHttpResponse(
+        _json_array_chunks(rows, struct),
+        content_type="application/json",
+    )
+
 
 class Error(Schema):
     detail: str
@@ -26,12 +86,15 @@ class Error(Schema):
 
 class AuthBearer(HttpBearer):
     async def authenticate(self, request, token):
-        try:
-            token_obj = await Token.objects.aget(key=token)
-            user = await User.objects.aget(id=token_obj.user_id)
-            return user
-        except Token.DoesNotExist:
-            return None
+        token_obj = cached_token(token)
+        if token_obj is None:
+            try:
+                token_obj = await Token.objects.select_related("user").aget(key=token)
+            except Token.DoesNotExist:
+                return None
+            remember_token(token_obj)
+
+        return token_obj.user
 
 
 router = Router(auth=AuthBearer())
@@ -84,195 +147,339 @@ class ValidationResultSchema(Schema):
     details: str
 
 
-class UserValidationResultSchema(Schema):
-    total_approved_credits: int
-    current_user_credits: int
-    total_spent_credits: int
-    total_charge_sales: int
-    is_consistent: bool
-    details: str
-
-
 @router.get("/phone-numbers", response=list[PhoneNumberResponseSchema])
 async def list_phone_numbers(request):
-    return [phone async for phone in PhoneNumber.objects.filter(is_active=True)]
+    phones = [
+        PhoneNumberStruct(*row)
+        async for row in PhoneNumber.objects.filter(is_active=True).values_list(
+            "id",
+            "number",
+            "is_active",
+        )
+    ]
+    return _json_response(phones)
 
 
 @router.get("/phone-numbers/{phone_id}", response=PhoneNumberSchema)
 async def get_phone_number(request, phone_id: int):
-    logger.info(f"User requesting phone number details for ID: {phone_id}")
+    logger.info("User requesting phone number details for ID: %s", phone_id)
     try:
-        return await PhoneNumber.objects.aget(id=phone_id)
+        phone = await PhoneNumber.objects.only(
+            "id",
+            "number",
+            "is_active",
+            "current_charge",
+        ).aget(id=phone_id)
     except PhoneNumber.DoesNotExist:
-        logger.exception(f"Phone number with ID {phone_id} not found")
+        logger.exception("Phone number with ID %s not found", phone_id)
         raise
+    return _json_response(
+        PhoneNumberDetailStruct(
+            phone.id,
+            phone.number,
+            phone.is_active,
+            phone.current_charge,
+        ),
+    )
 
 
 # Credit Request endpoints
 @router.get("/credit-requests", response=list[CreditRequestSchema])
 async def list_credit_requests(request):
     user = request.auth
-    logger.info(f"User {user.id} requesting credit requests list")
-    return [req async for req in CreditRequest.objects.filter(user=user)]
+    logger.info("User %s requesting credit requests list", user.id)
+    # values() rather than values_list(): Django 5.0's aiterator() can't drive
+    # the values_list() iterable.
+    credit_requests = CreditRequest.objects.filter(user=user).values(
+        "id",
+        "amount",
+        "status",
+        "processed",
+        "created_at",
+    )
+    return await _json_list_response(credit_requests, CreditRequestStruct)
 
 
 @router.post("/credit-requests", response=CreditRequestSchema)
 async def create_credit_request(request, data: CreditRequestCreateSchema):
     # user = await sync_to_async(get_user)(request)
     user = request.auth
-    logger.info(f"User {user.id} creating credit request for amount: {data.amount}")
-    return await CreditRequest.objects.acreate(
+    logger.info(
+        "User %s creating credit request for amount: %s",
+        user.id,
+        data.amount,
+    )
+    credit_request = await CreditRequest.objects.acreate(
         user=user,
         amount=data.amount,
     )
+    return _json_response(
+        CreditRequestStruct(
+            credit_request.id,
+            credit_request.amount,
+            credit_request.status,
+            credit_request.processed,
+            credit_request.created_at,
+        ),
+    )
 
 
 def approve_transaction(request, request_id: int):
-    logger.info(f"Processing credit request approval for request ID: {request_id}")
+    logger.info("Processing credit request approval for request ID: %s", request_id)
     try:
         with transaction.atomic():
-            # Lock the credit request row
-            credit_request = CreditRequest.objects.select_for_update().get(
+            # Flip the request only if it is still unprocessed; the UPDATE's row
+            # lock makes this the idempotency guard, no SELECT FOR UPDATE needed.
+            approved = CreditRequest.objects.filter(
                 id=request_id,
-            )
-
-            if credit_request.processed:
-                logger.warning(f"Credit request {request_id} was already processed")
-                return {"detail": "Already processed"}
-
-            # Update credit request status
-            credit_request.status = "APPROVED"
-            credit_request.processed = True
-            credit_request.save()
-
-            # Update user credit using F() expression to prevent race conditions
-            User.objects.filter(id=request.auth.id).select_for_update().update(
+                processed=False,
+            ).update(status="APPROVED", processed=True, updated_at=timezone.now())
+
+            if not approved:
+                # Raises DoesNotExist for an unknown id, which maps to a 404
+                CreditRequest.objects.values("id").get(id=request_id)
+                logger.warning("Credit request %s was already processed", request_id)
+                return None, "Already processed"
+
+            credit_request = CreditRequest.objects.only(
+                "id",
+                "user_id",
+                "amount",
+                "status",
+                "processed",
+                "created_at",
+            ).get(id=request_id)
+
+            # Credit the request's owner using F() to prevent race conditions
+            User.objects.filter(id=credit_request.user_id).update(
                 credit=F("credit") + credit_request.amount,
+                approved_credits_total=F("approved_credits_total")
+                + credit_request.amount,
             )
 
             logger.info(
-                f"Successfully approved credit request {request_id} for user {request.auth.id}",
+                "Successfully approved credit request %s for user %s",
+                request_id,
+                credit_request.user_id,
             )
-
-            # Refresh from db to get updated state
-            return CreditRequest.objects.get(id=request_id)
+            return credit_request, None
 
     except Exception as e:
-        logger.exception(f"Error processing credit request {request_id}: {e!s}")
+        logger.exception("Error processing credit request %s: %s", request_id, e)
         raise
 
 
-@router.post("/credit-requests/{request_id}/approve", response=CreditRequestSchema)
+@router.post(
+    "/credit-requests/{request_id}/approve",
+    response={200: CreditRequestSchema, 400: Error, 404: Error},
+)
 async def approve_credit_request(request, request_id: int):
-    # we could write custom exception handling here
-
-    return await sync_to_async(approve_transaction)(request, request_id)
+    # Django has no async atomic() yet, so the whole transaction runs in one
+    # executor hop rather than one hop per async ORM call. The helper opens and
+    # commits its own transaction, so it is safe to run off the serialized
+    # thread-sensitive executor on its own connection.
+    try:
+        credit_request, error = await database_sync_to_async(approve_transaction)(
+            request,
+            request_id,
+        )
+    except CreditRequest.DoesNotExist:
+        return 404, {"detail": "Credit request not found"}
+
+    if error:
+        return 400, {"detail": error}
+
+    return _json_response(
+        CreditRequestStruct(
+            credit_request.id,
+            credit_request.amount,
+            credit_request.status,
+            credit_request.processed,
+            credit_request.created_at,
+        ),
+    )
 
 
 # Charge Sale endpoints
 @router.get("/charge-sales", response=list[ChargeSaleSchema])
 async def list_charge_sales(request):
     user = request.auth
-    logger.info(f"User {user} requesting charge sales list")
-    return [sale async for sale in ChargeSale.objects.filter(user=user)]
+    logger.info("User %s requesting charge sales list", user.id)
+    charge_sales = ChargeSale.objects.filter(user=user).values(
+        "id",
+        "amount",
+        "status",
+        "phone_number_id",
+        "created_at",
+    )
+    return await _json_list_response(charge_sales, ChargeSaleStruct)
+
+
+# Debit, phone top-up and sale insert in one statement. The debit only
+# matches when the user can afford it and the phone exists, and the other two
+# steps only run off its RETURNING row, so a short balance touches nothing.
+_CREATE_CHARGE_SALE_SQL = f"""
+    WITH debit AS (
+        UPDATE {User._meta.db_table}
+        SET credit = credit - %(amount)s,
+            charge_sales_total = charge_sales_total + %(amount)s
+        WHERE id = %(user_id)s
+            AND credit >= %(amount)s
+            AND EXISTS (
+                SELECT 1 FROM {PhoneNumber._meta.db_table} WHERE id = %(phone_id)s
+            )
+        RETURNING id
+    ), topup AS (
+        UPDATE {PhoneNumber._meta.db_table}
+        SET current_charge = current_charge + %(amount)s
+        WHERE id = %(phone_id)s AND EXISTS (SELECT 1 FROM debit)
+        RETURNING id
+    )
+    INSERT INTO {ChargeSale._meta.db_table} (
+        user_id, phone_number_id, amount, status, processed, admin_notes,
+        created_at, updated_at
+    )
+    SELECT debit.id, topup.id, %(amount)s, 'APPROVED', true, '', %(now)s, %(now)s
+    FROM debit, topup
+    RETURNING id, created_at
+"""  # noqa: S608, SLF001
 
 
 def create_charge(request, data):
     logger.info(
-        f"Creating charge sale for user {request.auth.id}, amount: {data.amount}, phone: {data.phone_number_id}",
+        "Creating charge sale for user %s, amount: %s, phone: %s",
+        request.auth.id,
+        data.amount,
+        data.phone_number_id,
     )
 
     try:
-        with transaction.atomic():
-            # First get and lock the user row
-            user = User.objects.select_for_update().get(id=request.auth.id)
-
-            # Check credit AFTER getting lock
-            if user.credit < data.amount:
-                logger.warning(
-                    f"Insufficient credit for user {user.id}. Required: {data.amount}, Available: {user.credit}",
-                )
-                return {"detail": "Insufficient credit"}
-
-            # Proceed with the update using F expressions
-            User.objects.filter(id=user.id).update(
-                credit=F("credit") - data.amount,
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _CREATE_CHARGE_SALE_SQL,
+                {
+                    "user_id": request.auth.id,
+                    "phone_id": data.phone_number_id,
+                    "amount": data.amount,
+                    "now": timezone.now(),
+                },
             )
-
-            PhoneNumber.objects.filter(
-                id=data.phone_number_id,
-            ).select_for_update().update(
-                current_charge=F("current_charge") + data.amount,
-            )
-
-            charge_sale = ChargeSale.objects.create(
-                user=user,
-                phone_number_id=data.phone_number_id,
-                amount=data.amount,
-                processed=True,
-                status="APPROVED",
+            row = cursor.fetchone()
+
+        if row is None:
+            if not PhoneNumber.objects.filter(id=data.phone_number_id).exists():
+                return None, "Phone number not found"
+            logger.warning(
+                "Insufficient credit for user %s. Required: %s",
+                request.auth.id,
+                data.amount,
             )
-            logger.info(f"Successfully created charge sale for user {user.id}")
-            return charge_sale
+            return None, "Insufficient credit"
+
+        charge_sale_id, created_at = row
+        logger.info("Successfully created charge sale for user %s", request.auth.id)
+        return (
+            ChargeSaleStruct(
+                charge_sale_id,
+                data.amount,
+                "APPROVED",
+                data.phone_number_id,
+                created_at,
+            ),
+            None,
+        )
 
     except Exception as e:
-        logger.exception(f"Error creating charge sale: {e}")
+        logger.exception("Error creating charge sale: %s", e)
         raise
 
 
-@router.post("/charge-sales", response=ChargeSaleSchema)
+@router.post("/charge-sales", response={200: ChargeSaleSchema, 400: Error})
 async def create_charge_sale(request, data: ChargeSaleCreateSchema):
-    return await sync_to_async(create_charge)(request, data)
+    charge_sale, error = await database_sync_to_async(create_charge)(request, data)
+    if error:
+        return 400, {"detail": error}
+    return _json_response(charge_sale)
+
+
+_BULK_CHARGE_SALE_LIMIT = 500
 
 
-def create_charge_threaded(request, data):
+def create_charges(request, items):
+    total = sum(item.amount for item in items)
+    per_phone = defaultdict(int)
+    for item in items:
+        per_phone[item.phone_number_id] += item.amount
     logger.info(
-        f"[Threaded] Creating charge sale for user {request.auth.id}, amount: {data.amount}, phone: {data.phone_number_id}",
+        "Creating %s charge sales for user %s, total amount: %s",
+        len(items),
+        request.auth.id,
+        total,
     )
 
-    try:
-        with transaction.atomic():
-            # First get and lock the user row
-            user = User.objects.select_for_update().get(id=request.auth.id)
+    with transaction.atomic():
+        if PhoneNumber.objects.filter(id__in=per_phone).count() != len(per_phone):
+            return None, "Phone number not found"
 
-            if user.credit < data.amount:
-                logger.warning(
-                    f"[Threaded] Insufficient credit for user {user.id}. Required: {data.amount}, Available: {user.credit}",
-                )
-                return {"detail": "Insufficient credit"}
-
-            User.objects.filter(id=user.id).update(
-                credit=F("credit") - data.amount,
+        debited = User.objects.filter(id=request.auth.id, credit__gte=total).update(
+            credit=F("credit") - total,
+            charge_sales_total=F("charge_sales_total") + total,
+        )
+        if not debited:
+            logger.warning(
+                "Insufficient credit for user %s. Required: %s",
+                request.auth.id,
+                total,
             )
+            return None, "Insufficient credit"
 
-            PhoneNumber.objects.filter(
-                id=data.phone_number_id,
-            ).select_for_update().update(
-                current_charge=F("current_charge") + data.amount,
+        # One top-up per phone, in id order so concurrent batches touching the
+        # same phones lock them in the same order.
+        for phone_id in sorted(per_phone):
+            PhoneNumber.objects.filter(id=phone_id).update(
+                current_charge=F("current_charge") + per_phone[phone_id],
             )
 
-            charge_sale = ChargeSale.objects.create(
-                user=user,
-                phone_number_id=data.phone_number_id,
-                amount=data.amount,
-                processed=True,
-                status="APPROVED",
-            )
-            logger.info(
-                f"[Threaded] Successfully created charge sale for user {user.id}"
-            )
-            return charge_sale
+        charge_sales = ChargeSale.objects.bulk_create(
+            [
+                ChargeSale(
+                    user_id=request.auth.id,
+                    phone_number_id=item.phone_number_id,
+                    amount=item.amount,
+                    status="APPROVED",
+                    processed=True,
+                )
+                for item in items
+            ],
+        )
 
-    except Exception as e:
-        logger.exception(f"[Threaded] Error creating charge sale: {e}")
-        raise
+    return [
+        ChargeSaleStruct(
+            charge_sale.id,
+            charge_sale.amount,
+            charge_sale.status,
+            charge_sale.phone_number_id,
+            charge_sale.created_at,
+        )
+        for charge_sale in charge_sales
+    ], None
 
 
-@router.post("/charge-sales/threaded", response=ChargeSaleSchema)
-def create_charge_sale_threaded(request, data: ChargeSaleCreateSchema):
-    with ThreadPoolExecutor(max_workers=20) as executor:
-        future = executor.submit(create_charge_threaded, request, data)
-        return future.result()
+@router.post(
+    "/charge-sales/bulk",
+    response={200: list[ChargeSaleSchema], 400: Error},
+)
+async def create_charge_sales_bulk(request, data: list[ChargeSaleCreateSchema]):
+    # All-or-nothing: one debit for the batch total and one multi-row INSERT,
+    # committed together so validation never sees a half-applied batch.
+    if not data or len(data) > _BULK_CHARGE_SALE_LIMIT:
+        return 400, {
+            "detail": f"Send between 1 and {_BULK_CHARGE_SALE_LIMIT} charge sales",
+        }
+    charge_sales, error = await database_sync_to_async(create_charges)(request, data)
+    if error:
+        return 400, {"detail": error}
+    return _json_response(charge_sales)
 
 
 @router.get("/validate", response=ValidationResultSchema)
@@ -281,32 +488,18 @@ async def validate_transactions(request):
     logger.info("Running transaction validation")
 
     try:
-        # Get total approved credits (what users received)
-        approved_credits = await CreditRequest.objects.filter(
-            status="APPROVED",
-            processed=True,
-        ).aaggregate(total=models.Sum("amount"))
-        total_approved_credits = approved_credits["total"] or 0
-
-        # Get current remaining credits across all users
-        current_credits = await User.objects.aaggregate(
-            total=models.Sum("credit"),
-        )
-        current_user_credits = current_credits["total"] or 0
+        (
+            total_approved_credits,
+            current_user_credits,
+            total_charge_sales,
+        ) = await database_sync_to_async(transaction_totals)()
 
         # Calculate how much credit was spent
         total_spent_credits = total_approved_credits - current_user_credits
 
-        # Get total successful charge sales
-        charge_sales = await ChargeSale.objects.filter(
-            status="APPROVED",
-            processed=True,
-        ).aaggregate(total=models.Sum("amount"))
-        total_charge_sales = charge_sales["total"] or 0
-
         # Validate that spent credits match charge sales
         is_consistent = (
-            abs(total_spent_credits - total_charge_sales) == 0
+            total_spent_credits == total_charge_sales
         )  # this could be compared with a threshold
 
         details = (
@@ -331,45 +524,31 @@ async def validate_transactions(request):
 
 @router.get(
     "/users/{user_id}/validate",
-    response={200: UserValidationResultSchema, 404: Error},
+    response={200: ValidationResultSchema, 404: Error},
 )
 async def validate_user_transactions(request, user_id: int):
     try:
-        user = await User.objects.aget(id=user_id)
-
-        # Get total approved credits (what users received)
-        approved_credits = await CreditRequest.objects.filter(
-            user=user,
-            status="APPROVED",
-            processed=True,
-        ).aaggregate(total=models.Sum("amount"))
-        total_approved_credits = approved_credits["total"] or 0
-
-        total_spent_credits = total_approved_credits - user.credit
+        (
+            total_approved_credits,
+            current_user_credits,
+            total_charge_sales,
+        ) = await database_sync_to_async(user_transaction_totals)(user_id)
 
-        # Get total successful charge sales
-        charge_sales = await ChargeSale.objects.filter(
-            user=user,
-            status="APPROVED",
-            processed=True,
-        ).aaggregate(total=models.Sum("amount"))
-
-        total_charge_sales = charge_sales["total"] or 0
+        total_spent_credits = total_approved_credits - current_user_credits
 
         # Validate that spent credits match charge sales
-        is_consistent = (
-            abs(total_spent_credits - total_charge_sales) == 0
-        )  # this could be compared with a threshold
+        is_consistent = total_spent_credits == total_charge_sales
 
         details = (
             "All transactions are consistent"
             if is_consistent
-            else f"Mismatch: User spent {total_spent_credits} but charge sales total is {total_charge_sales}"
+            else f"Mismatch: User spent {total_spent_credits} "
+            f"but charge sales total is {total_charge_sales}"
         )
 
         return {
             "total_approved_credits": total_approved_credits,
-            "current_user_credits": user.credit,
+            "current_user_credits": current_user_credits,
             "total_spent_credits": total_spent_credits,
             "total_charge_sales": total_charge_sales,
             "is_consistent": is_consistent,
@@ -377,8 +556,11 @@ async def validate_user_transactions(request, user_id: int):
         }
 
     except User.DoesNotExist:
-        logger.error(f"User {user_id} not found")
+        logger.error("User %s not found", user_id)
         return 404, {"detail": "User not found"}
     except Exception:
-        logger.exception(f"Error validating user transactions for user ID {user_id}")
+        logger.exception(
+            "Error validating user transactions for user ID %s",
+            user_id,
+        )
         raise
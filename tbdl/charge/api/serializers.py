@@ -68,13 +68,12 @@ class ChargeSaleSerializer(serializers.ModelSerializer):
         read_only_fields = ["status", "processed", "created_at"]
 
     async def validate(self, attrs):
-        phone_number = await PhoneNumber.objects.filter(
+        phone_number_exists = await PhoneNumber.objects.filter(
             id=attrs["phone_number_id"],
             is_active=True,
-        ).afirst()
-        if not phone_number:
+        ).aexists()
+        if not phone_number_exists:
             raise serializers.ValidationError("Invalid phone number")
         if attrs["amount"] <= 0:
             raise serializers.ValidationError("Amount must be greater than 0")
-        attrs["phone_number"] = phone_number
         return attrs
@@ -0,0 +1,34 @@
+"""msgspec mirrors of the ninja response schemas, encoded without Pydantic."""
+
+from datetime import datetime
+
+import msgspec
+
+
+class PhoneNumberStruct(msgspec.Struct, gc=False):
+    id: int
+    number: str
+    is_active: bool
+
+
+class PhoneNumberDetailStruct(msgspec.Struct, gc=False):
+    id: int
+    number: str
+    is_active: bool
+    current_charge: int
+
+
+class CreditRequestStruct(msgspec.Struct, gc=False):
+    id: int
+    amount: int
+    status: str
+    processed: bool
+    created_at: datetime
+
+
+class ChargeSaleStruct(msgspec.Struct, gc=False):
+    id: int
+    amount: int
+    status: str
+    phone_number_id: int
+    created_at: datetime
@@ -2,10 +2,10 @@ import logging
 
 from adrf.mixins import ListModelMixin
 from adrf.viewsets import GenericViewSet
-from asgiref.sync import sync_to_async
-from django.db import models
+from django.core.cache import cache
+from django.db import connection
 from django.db import transaction
-from django.db.models import F
+from django.utils import timezone
 from drf_spectacular.utils import OpenApiExample
 from drf_spectacular.utils import OpenApiParameter
 from drf_spectacular.utils import OpenApiResponse
@@ -15,13 +15,23 @@ from drf_spectacular.utils import inline_serializer
 from rest_framework import serializers
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.fields import empty
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 
+from tbdl.charge.cache import ACTIVE_PHONES_CACHE_KEY
+from tbdl.charge.cache import ACTIVE_PHONES_CACHE_TTL
+from tbdl.charge.db import database_sync_to_async
+from tbdl.charge.db import refresh_transaction_consistency
+from tbdl.charge.db import transaction_consistency
+from tbdl.charge.db import user_transaction_totals
 from tbdl.charge.models import ChargeSale
 from tbdl.charge.models import CreditRequest
 from tbdl.charge.models import PhoneNumber
 from tbdl.users.models import User
 
+from .renderers import MsgspecJSONRenderer
 from .serializers import ChargeSaleSerializer
 from .serializers import CreditRequestSerializer
 from .serializers import PhoneNumberSerializer
@@ -29,6 +39,13 @@ from .serializers import PhoneNumberSerializer
 logger = logging.getLogger(__name__)
 
 
+def _representation(instance, serializer_class):
+    # The read side of these serializers is a plain field copy, so responses
+    # take the Meta field values directly and leave encoding to the renderer
+    # instead of walking to_representation() per field.
+    return {field: getattr(instance, field) for field in serializer_class.Meta.fields}
+
+
 @extend_schema_view(
     list=extend_schema(
         summary="List active phone numbers",
@@ -49,45 +66,88 @@ logger = logging.getLogger(__name__)
     ),
 )
 class PhoneNumberViewSet(GenericViewSet):
+    """Phone number management"""
+
     serializer_class = PhoneNumberSerializer
     queryset = PhoneNumber.objects.all()
+    renderer_classes = [MsgspecJSONRenderer, BrowsableAPIRenderer]
 
-    async def list(self, request):
-        phone_numbers = [
-            phone_number
-            async for phone_number in PhoneNumber.objects.filter(is_active=True)
+    async def _active_phone_numbers(self):
+        return [
+            row
+            async for row in PhoneNumber.objects.filter(is_active=True).values(
+                *PhoneNumberSerializer.Meta.fields,
+            )
         ]
-        serializer = PhoneNumberSerializer(phone_numbers, many=True)
-        return Response(serializer.data)
+
+    async def list(self, request):
+        return Response(await self._active_phone_numbers())
 
     async def retrieve(self, request, pk=None):
         try:
-            phone_number = await PhoneNumber.objects.aget(pk=pk)
-            serializer = PhoneNumberSerializer(phone_number)
-            return Response(serializer.data)
+            phone_number = await PhoneNumber.objects.values(
+                *PhoneNumberSerializer.Meta.fields,
+            ).aget(pk=pk)
+            return Response(phone_number)
         except PhoneNumber.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
     @action(detail=False, methods=["get"])
     async def active(self, request):
-        phone_numbers = [
-            phone_number
-            async for phone_number in PhoneNumber.objects.filter(
-                is_active=True,
-            ).select_related()
-        ]
-        serializer = PhoneNumberSerializer(phone_numbers, many=True)
-        return Response(serializer.data)
+        # The rows are cached rather than rendered bytes so the response still
+        # goes through the viewset's renderers, browsable API included.
+        phone_numbers = await cache.aget(ACTIVE_PHONES_CACHE_KEY)
+        if phone_numbers is None:
+            phone_numbers = await self._active_phone_numbers()
+            await cache.aset(
+                ACTIVE_PHONES_CACHE_KEY,
+                phone_numbers,
+                ACTIVE_PHONES_CACHE_TTL,
+            )
+        return Response(phone_numbers)
+
 
+# Building a CreditRequestSerializer copies its declared fields on every
+# instantiation; create only needs the amount, so it runs this one field and
+# keeps the serializer's error bodies.
+_amount_field = serializers.IntegerField()
 
-@sync_to_async
+
+def _validated_amount(data):
+    if not isinstance(data, dict):
+        return None, {"non_field_errors": ["Invalid data. Expected a dictionary."]}
+    try:
+        amount = _amount_field.run_validation(data.get("amount", empty))
+    except serializers.ValidationError as exc:
+        return None, {"amount": exc.detail}
+    if amount <= 0:
+        return None, {"amount": ["Amount must be greater than 0"]}
+    return amount, None
+
+
+@database_sync_to_async
 def create_credit_request(user, amount):
-    with transaction.atomic():
-        credit_request = CreditRequest.objects.create(
-            user=user,
-            amount=amount,
-        )
-        return credit_request
+    # A single INSERT under autocommit is already atomic.
+    return CreditRequest.objects.create(user=user, amount=amount)
+
+
+# Marks the request approved and credits its owner in one statement. The
+# NOT processed guard lets only one of two concurrent approvals match, and the
+# row locks last for this statement alone rather than a whole transaction.
+_APPROVE_CREDIT_REQUEST_SQL = f"""
+    WITH approved AS (
+        UPDATE {CreditRequest._meta.db_table}
+        SET status = 'APPROVED', processed = true, updated_at = %(now)s
+        WHERE id = %(id)s AND NOT processed
+        RETURNING user_id, amount
+    )
+    UPDATE {User._meta.db_table} u
+    SET credit = u.credit + approved.amount,
+        approved_credits_total = u.approved_credits_total + approved.amount
+    FROM approved
+    WHERE u.id = approved.user_id
+    RETURNING u.id
+"""  # noqa: S608, SLF001
 
 
 @extend_schema_view(
@@ -125,23 +185,23 @@ def create_credit_request(user, amount):
     ),
 )
 class CreditRequestViewSet(GenericViewSet, ListModelMixin):
+    """Credit request management"""
+
     serializer_class = CreditRequestSerializer
     queryset = CreditRequest.objects.all()
+    renderer_classes = [MsgspecJSONRenderer, BrowsableAPIRenderer]
     lookup_field = "pk"
     lookup_url_kwarg = "pk"
 
     async def create(self, request):
-        serializer = CreditRequestSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        amount, errors = _validated_amount(request.data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            credit_request = await create_credit_request(
-                request.user,
-                serializer.validated_data["amount"],
-            )
+            credit_request = await create_credit_request(request.user, amount)
             return Response(
-                CreditRequestSerializer(credit_request).data,
+                _representation(credit_request, CreditRequestSerializer),
                 status=status.HTTP_201_CREATED,
             )
         except Exception:
@@ -152,33 +212,28 @@ class CreditRequestViewSet(GenericViewSet, ListModelMixin):
             )
 
     async def list(self, request):
+        # Plain rows go straight to the renderer; the serializer adds nothing
+        # to a read-only listing but per-field overhead.
         credit_requests = [
-            request async for request in CreditRequest.objects.filter(user=request.user)
+            row
+            async for row in CreditRequest.objects.filter(user=request.user).values(
+                *CreditRequestSerializer.Meta.fields,
+            )
         ]
-        serializer = CreditRequestSerializer(credit_requests, many=True)
-        return Response(serializer.data)
+        return Response(credit_requests)
 
     def perform_approve(self, credit_request):
-        with transaction.atomic():
-            # Lock both records
-            credit_request = CreditRequest.objects.select_for_update().get(
-                id=credit_request.id,
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _APPROVE_CREDIT_REQUEST_SQL,
+                {"id": credit_request.id, "now": timezone.now()},
             )
-            user = User.objects.select_for_update().get(id=credit_request.user_id)
-
-            if credit_request.processed:
+            if cursor.fetchone() is None:
                 return None, "Already processed"
 
-            credit_request.status = "APPROVED"
-            credit_request.processed = True
-            credit_request.save()
-
-            # Use F() to prevent race conditions
-            User.objects.filter(id=user.id).update(
-                credit=F("credit") + credit_request.amount,
-            )
-
-            return credit_request, None
+        credit_request.status = "APPROVED"
+        credit_request.processed = True
+        return credit_request, None
 
     @extend_schema(
         parameters=[
@@ -194,7 +249,9 @@ class CreditRequestViewSet(GenericViewSet, ListModelMixin):
     async def approve(self, request, pk=None):
         try:
             credit_request = await CreditRequest.objects.aget(pk=pk)
-            result, error = await sync_to_async(self.perform_approve)(credit_request)
+            result, error = await database_sync_to_async(self.perform_approve)(
+                credit_request,
+            )
 
             if error:
                 return Response(
@@ -202,25 +259,72 @@ class CreditRequestViewSet(GenericViewSet, ListModelMixin):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            return Response(CreditRequestSerializer(result).data)
+            return Response(_representation(result, CreditRequestSerializer))
         except CreditRequest.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
 
-@sync_to_async
+# Debit and phone top-up in one statement. The top-up only runs off the
+# debit's RETURNING row, and the debit only matches when the balance covers the
+# amount and the phone is still active, so an empty result means nothing moved.
+_DEBIT_AND_TOPUP_SQL = f"""
+    WITH debit AS (
+        UPDATE {User._meta.db_table}
+        SET credit = credit - %(amount)s,
+            charge_sales_total = charge_sales_total + %(amount)s
+        WHERE id = %(user_id)s
+            AND credit >= %(amount)s
+            AND EXISTS (
+                SELECT 1 FROM {PhoneNumber._meta.db_table}
+                WHERE id = %(phone_id)s AND is_active
+            )
+        RETURNING id
+    )
+    UPDATE {PhoneNumber._meta.db_table}
+    SET current_charge = current_charge + %(amount)s
+    WHERE id = %(phone_id)s AND EXISTS (SELECT 1 FROM debit)
+    RETURNING id
+"""  # noqa: S608, SLF001
+
+
+def _consistency_report(total_approved, current_total, total_sales, refreshed_at):
+    total_spent = total_approved - current_total
+    is_consistent = total_spent == total_sales
+    return {
+        "total_approved_credits": total_approved,
+        "current_user_credits": current_total,
+        "total_spent_credits": total_spent,
+        "total_charge_sales": total_sales,
+        "is_consistent": is_consistent,
+        "details": "All transactions are consistent"
+        if is_consistent
+        else f"Mismatch: Users spent {total_spent} "
+        f"but charge sales total is {total_sales}",
+        "refreshed_at": refreshed_at,
+    }
+
+
+@database_sync_to_async
 def create_charge_sale(user, amount, phone_number_id):
     with transaction.atomic():
-        user = User.objects.select_for_update().get(id=user.id)
-        if user.credit < amount:
-            return None, "Insufficient credit"
-
-        # Update user credit using F() expression
-        User.objects.filter(id=user.id).update(credit=F("credit") - amount)
-
-        # Update phone number charge using F() expression
-        PhoneNumber.objects.filter(id=phone_number_id).select_for_update().update(
-            current_charge=F("current_charge") + amount,
-        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _DEBIT_AND_TOPUP_SQL,
+                {
+                    "amount": amount,
+                    "user_id": user.id,
+                    "phone_id": phone_number_id,
+                },
+            )
+            if cursor.fetchone() is None:
+                # The serializer checked the phone, but it may have been
+                # deactivated or deleted since; name whichever cause it was.
+                if not PhoneNumber.objects.filter(
+                    id=phone_number_id,
+                    is_active=True,
+                ).exists():
+                    return None, "Phone number not found"
+                return None, "Insufficient credit"
 
         charge_sale = ChargeSale.objects.create(
             user=user,
@@ -229,8 +333,6 @@ def create_charge_sale(user, amount, phone_number_id):
             status="APPROVED",
             processed=True,
         )
-
-        user.refresh_from_db()
         return charge_sale, None
 
 
@@ -271,7 +373,15 @@ def create_charge_sale(user, amount, phone_number_id):
     ),
     validate_all=extend_schema(
         summary="Validate all transactions",
-        description="Validate consistency between credit requests and charge sales across all users",
+        description=(
+            "Validate consistency between credit requests and charge sales "
+            "across all users, from a snapshot at most 10 seconds old"
+        ),
+    ),
+    refresh_validation=extend_schema(
+        summary="Refresh transaction validation",
+        description="Recompute the validate_all snapshot (admin only)",
+        request=None,
     ),
     validate_user=extend_schema(
         summary="Validate user transactions",
@@ -288,120 +398,90 @@ def create_charge_sale(user, amount, phone_number_id):
     ),
 )
 class ChargeSaleViewSet(GenericViewSet):
+    """Charge sale management"""
+
     serializer_class = ChargeSaleSerializer
     queryset = ChargeSale.objects.all()
+    renderer_classes = [MsgspecJSONRenderer, BrowsableAPIRenderer]
 
     async def get_queryset(self):
         # This helps with schema generation
         return self.queryset.filter(user=self.request.user)
 
     async def create(self, request):
-        try:
-            serializer = ChargeSaleSerializer(data=request.data)
-            if not serializer.is_valid():
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-            validated_data = await serializer.validated_data
-            charge_sale, error = await create_charge_sale(
-                request.user,
-                validated_data["amount"],
-                validated_data["phone_number_id"],
-            )
-            if error:
-                return Response(
-                    {"detail": error},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            return Response(
-                ChargeSaleSerializer(charge_sale).data,
-                status=status.HTTP_201_CREATED,
-            )
-        except PhoneNumber.DoesNotExist:
+        serializer = ChargeSaleSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = await serializer.validated_data
+        charge_sale, error = await create_charge_sale(
+            request.user,
+            validated_data["amount"],
+            validated_data["phone_number_id"],
+        )
+        if error:
             return Response(
-                {"detail": "Phone number not found"},
+                {"detail": error},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        return Response(
+            _representation(charge_sale, ChargeSaleSerializer),
+            status=status.HTTP_201_CREATED,
+        )
 
     async def list(self, request):
         charge_sales = [
-            sale async for sale in ChargeSale.objects.filter(user=request.user)
+            row
+            async for row in ChargeSale.objects.filter(user=request.user).values(
+                *ChargeSaleSerializer.Meta.fields,
+            )
         ]
-        serializer = ChargeSaleSerializer(charge_sales, many=True)
-        return Response(serializer.data)
+        return Response(charge_sales)
 
     @action(detail=False, methods=["get"])
     async def validate_all(self, request):
         try:
-            approved_credits = await CreditRequest.objects.filter(
-                status="APPROVED",
-                processed=True,
-            ).aaggregate(total=models.Sum("amount"))
-
-            current_credits = await User.objects.aaggregate(
-                total=models.Sum("credit"),
-            )
-
-            total_approved = approved_credits["total"] or 0
-            current_total = current_credits["total"] or 0
-            total_spent = total_approved - current_total
-
-            charge_sales = await ChargeSale.objects.filter(
-                status="APPROVED",
-                processed=True,
-            ).aaggregate(total=models.Sum("amount"))
-            total_sales = charge_sales["total"] or 0
-
-            is_consistent = abs(total_spent - total_sales) == 0
-
-            return Response(
-                {
-                    "total_approved_credits": total_approved,
-                    "current_user_credits": current_total,
-                    "total_spent_credits": total_spent,
-                    "total_charge_sales": total_sales,
-                    "is_consistent": is_consistent,
-                    "details": "All transactions are consistent"
-                    if is_consistent
-                    else f"Mismatch: Users spent {total_spent} but charge sales total is {total_sales}",
-                },
-            )
+            # Read-only: the report is as of refreshed_at. Only
+            # refresh_validation or the refresh_transaction_consistency
+            # command recompute it.
+            snapshot = await database_sync_to_async(transaction_consistency)()
+            return Response(_consistency_report(*snapshot))
         except Exception:
             logger.exception("Error during transaction validation")
             raise
 
+    @action(detail=False, methods=["post"], permission_classes=[IsAdminUser])
+    async def refresh_validation(self, request):
+        await database_sync_to_async(refresh_transaction_consistency)()
+        snapshot = await database_sync_to_async(transaction_consistency)()
+        return Response(_consistency_report(*snapshot))
+
     @action(detail=False, methods=["get"], url_path="validate/(?P<user_id>[^/.]+)")
     async def validate_user(self, request, user_id=None):
         try:
-            user = await User.objects.aget(id=user_id)
-
-            approved = await CreditRequest.objects.filter(
-                user=user,
-                status="APPROVED",
-                processed=True,
-            ).aaggregate(total=models.Sum("amount"))
-
-            total_approved = approved["total"] or 0
-            total_spent = total_approved - user.credit
-
-            sales = await ChargeSale.objects.filter(
-                user=user,
-                status="APPROVED",
-                processed=True,
-            ).aaggregate(total=models.Sum("amount"))
-            total_sales = sales["total"] or 0
-
-            is_consistent = abs(total_spent - total_sales) == 0
+            (
+                total_approved,
+                current_credit,
+                total_sales,
+            ) = await database_sync_to_async(user_transaction_totals)(user_id)
+            total_spent = total_approved - current_credit
+            is_consistent = total_spent == total_sales
+
+            details = (
+                "All transactions are consistent"
+                if is_consistent
+                else f"Mismatch: User spent {total_spent} "
+                f"but charge sales total is {total_sales}"
+            )
 
             return Response(
                 {
                     "total_approved_credits": total_approved,
-                    "current_user_credits": user.credit,
+                    "current_user_credits": current_credit,
                     "total_spent_credits": total_spent,
                     "total_charge_sales": total_sales,
                     "is_consistent": is_consistent,
-                    "details": "All transactions are consistent"
-                    if is_consistent
-                    else f"Mismatch: User spent {total_spent} but charge sales total is {total_sales}",
+                    "details": details,
                 },
             )
         except User.DoesNotExist:
@@ -411,6 +491,7 @@ class ChargeSaleViewSet(GenericViewSet):
             )
         except Exception:
             logger.exception(
-                f"Error validating user transactions for user ID {user_id}",
+                "Error validating user transactions for user ID %s",
+                user_id,
             )
             raise
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ChargeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tbdl.charge"
+
+    def ready(self):
+        # Imported unguarded: the auth and active-phone caches depend on these
+        # receivers, so a broken import must fail startup, not disable eviction.
+        import tbdl.charge.signals  # noqa: F401
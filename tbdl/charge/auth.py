@@ -0,0 +1,20 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from tbdl.charge.cache import cached_token
+from tbdl.charge.cache import remember_token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        token = cached_token(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            remember_token(token)
+            return user, token
+
+        # Same result as a miss: (user, token), and inactive users rejected
+        if not token.user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        return token.user, token
@@ -0,0 +1,95 @@
+"""Process-local and shared caches for the charge APIs and their eviction.
+
+Kept free of view, serializer and model imports so tbdl.charge.signals can
+load it from AppConfig.ready() without pulling in either API.
+"""
+
+import threading
+from collections import defaultdict
+
+from cachetools import TTLCache
+from django.core.cache import cache
+
+
+class _TokenCache(TTLCache):
+    """TTLCache of tokens that also indexes their keys by user id, so dropping
+    a user's tokens doesn't scan the whole cache.
+
+    Entries leave through expire() on TTL and popitem() on LRU overflow; both
+    are hooked here to keep the index from accumulating dead keys.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._keys_by_user = defaultdict(set)
+
+    def __setitem__(self, key, token):
+        super().__setitem__(key, token)
+        self._keys_by_user[token.user_id].add(key)
+
+    def _unindex(self, key, token):
+        keys = self._keys_by_user.get(token.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[token.user_id]
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, token in expired:
+            self._unindex(key, token)
+        return expired
+
+    def popitem(self):
+        key, token = super().popitem()
+        self._unindex(key, token)
+        return key, token
+
+    def forget(self, key):
+        token = self.pop(key, None)
+        if token is not None:
+            self._unindex(key, token)
+
+    def forget_user(self, user_id):
+        for key in self._keys_by_user.pop(user_id, ()):
+            self.pop(key, None)
+
+
+# Token key -> Token (with its user loaded) for recently seen tokens, shared by
+# the ninja bearer auth and the DRF token auth so repeat clients skip the auth
+# query. Entries are evicted by tbdl.charge.signals when a token is deleted or
+# its user is saved; other worker processes only drop them when the TTL
+# expires. Endpoints must not trust cached fields that change often, such as
+# credit.
+_auth_cache = _TokenCache(maxsize=10_000, ttl=60)
+_auth_cache_lock = threading.Lock()
+
+# Rows of the DRF active-phones listing. Dropped by the PhoneNumber save/delete
+# signals. Sales bump current_charge through queryset.update(), which sends no
+# signal, so the TTL bounds how stale the listed balances can get.
+ACTIVE_PHONES_CACHE_KEY = "charge:active-phones"
+ACTIVE_PHONES_CACHE_TTL = 5
+
+
+def cached_token(key):
+    with _auth_cache_lock:
+        return _auth_cache.get(key)
+
+
+def remember_token(token):
+    with _auth_cache_lock:
+        _auth_cache[token.key] = token
+
+
+def forget_token(key):
+    with _auth_cache_lock:
+        _auth_cache.forget(key)
+
+
+def forget_user(user_id):
+    with _auth_cache_lock:
+        _auth_cache.forget_user(user_id)
+
+
+def forget_active_phones():
+    cache.delete(ACTIVE_PHONES_CACHE_KEY)
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db import connection
+
+from tbdl.charge.models import ChargeSale
+from tbdl.charge.models import CreditRequest
+from tbdl.users.models import User
+
+# Each pool thread holds its own connection (kept for CONN_MAX_AGE between
+# calls), so the pool size caps the connections these helpers open per worker
+# process. asgiref's default executor would allow min(32, cpu + 4).
+_executor = ThreadPoolExecutor(
+    max_workers=settings.CHARGE_DB_THREADS,
+    thread_name_prefix="charge-db",
+)
+
+
+def database_sync_to_async(func):
+    """Run ``func`` on the bounded charge database pool with request-style
+    connection upkeep.
+
+    Pool threads never see request_started/request_finished, so without the
+    explicit close_old_connections() calls their persistent connections would
+    outlive CONN_MAX_AGE and skip CONN_HEALTH_CHECKS.
+    """
+
+    @wraps(func)
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False, executor=_executor)
+
+
+# Approved credits, remaining user credits and charge sales in one round trip,
+# read from a single snapshot so concurrent sales can't skew the comparison.
+_TRANSACTION_TOTALS_SQL = f"""
+    SELECT
+        (
+            SELECT COALESCE(SUM(amount), 0) FROM {CreditRequest._meta.db_table}
+            WHERE status = 'APPROVED' AND processed
+        ),
+        (SELECT COALESCE(SUM(credit), 0) FROM {User._meta.db_table}),
+        (
+            SELECT COALESCE(SUM(amount), 0) FROM {ChargeSale._meta.db_table}
+            WHERE status = 'APPROVED' AND processed
+        )
+"""  # noqa: S608, SLF001
+
+
+def transaction_totals():
+    with connection.cursor() as cursor:
+        cursor.execute(_TRANSACTION_TOTALS_SQL)
+        return cursor.fetchone()
+
+
+# Materialized by charge migration 0006. Reading it is a single-row SELECT; the
+# numbers are as of refreshed_at, the last refresh_transaction_consistency()
+# call. Reads never refresh it, so a burst of readers can't queue full-ledger
+# aggregations behind each other.
+_CONSISTENCY_VIEW = "transaction_consistency"
+
+
+def transaction_consistency():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT approved, credits, sales, refreshed_at FROM {_CONSISTENCY_VIEW}",  # noqa: S608
+        )
+        return cursor.fetchone()
+
+
+def refresh_transaction_consistency():
+    # CONCURRENTLY keeps the old snapshot readable while the aggregates run.
+    with connection.cursor() as cursor:
+        cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {_CONSISTENCY_VIEW}")
+
+
+def user_transaction_totals(user_id):
+    # The running totals move in the same UPDATE as credit (see the approve and
+    # charge sale paths), so this is a primary key lookup, not an aggregate.
+    # Writes that bypass those paths, such as admin edits, leave them stale
+    # until the repair_user_transaction_totals command recomputes them.
+    return User.objects.values_list(
+        "approved_credits_total",
+        "credit",
+        "charge_sales_total",
+    ).get(id=user_id)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tbdl.charge.db import refresh_transaction_consistency
+from tbdl.charge.db import transaction_consistency
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the transaction_consistency snapshot served by validate_all. "
+        "Run it from cron or another scheduler; reads never refresh it."
+    )
+
+    def handle(self, *args, **options):
+        refresh_transaction_consistency()
+        approved, user_credits, sales, refreshed_at = transaction_consistency()
+        self.stdout.write(
+            f"Refreshed at {refreshed_at.isoformat()}: "
+            f"approved={approved} credits={user_credits} sales={sales}",
+        )
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.db.models import Subquery
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from tbdl.charge.models import ChargeSale
+from tbdl.charge.models import CreditRequest
+from tbdl.users.models import User
+
+
+def _approved_total(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                user_id=OuterRef("pk"),
+                status="APPROVED",
+                processed=True,
+            )
+            .values("user_id")
+            .annotate(total=Sum("amount"))
+            .values("total"),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute User.approved_credits_total and User.charge_sales_total from "
+        "the approved credit requests and charge sales. The API keeps them in "
+        "step, but edits made elsewhere, such as the admin or a shell, do not."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only list users whose totals have drifted.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(
+                User.objects.select_for_update()
+                .annotate(
+                    ledger_approved=_approved_total(CreditRequest),
+                    ledger_sales=_approved_total(ChargeSale),
+                )
+                .filter(
+                    ~Q(approved_credits_total=F("ledger_approved"))
+                    | ~Q(charge_sales_total=F("ledger_sales")),
+                )
+                .values_list("id", "ledger_approved", "ledger_sales"),
+            )
+            for user_id, approved, sales in drifted:
+                self.stdout.write(
+                    f"User {user_id}: approved={approved} sales={sales}",
+                )
+                if not options["check"]:
+                    User.objects.filter(id=user_id).update(
+                        approved_credits_total=approved,
+                        charge_sales_total=sales,
+                    )
+
+        verb = "have drifted" if options["check"] else "repaired"
+        self.stdout.write(f"{len(drifted)} user(s) {verb}")
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.9 on 2026-10-15 06:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charge', '0004_remove_chargesale_seller'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chargesale',
+            name='charge_sale_status_b0f433_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='creditrequest',
+            name='credit_requ_status_f2488a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='chargesale',
+            index=models.Index(condition=models.Q(('processed', True), ('status', 'APPROVED')), fields=['user', 'amount'], name='cs_approved_user_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditrequest',
+            index=models.Index(condition=models.Q(('processed', True), ('status', 'APPROVED')), fields=['user', 'amount'], name='cr_approved_user_amount_idx'),
+        ),
+    ]
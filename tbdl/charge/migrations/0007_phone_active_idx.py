@@ -0,0 +1,21 @@
+# Generated by Django 5.0.9 on 2026-10-15 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charge', '0006_transaction_consistency_view'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='phonenumber',
+            name='phone_numbe_is_acti_eb40ae_idx',
+        ),
+        migrations.AddIndex(
+            model_name='phonenumber',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='phone_active_idx'),
+        ),
+    ]
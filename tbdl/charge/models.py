@@ -16,7 +16,15 @@ class PhoneNumber(models.Model):
         db_table = "phone_numbers"
         indexes = [
             models.Index(fields=["number"]),
-            models.Index(fields=["is_active"]),
+            # The active listings read only active rows, so the index leaves
+            # inactive rows out entirely. It deliberately covers no columns:
+            # every sale bumps current_charge, and indexing it would rule out
+            # HOT updates on the hottest rows.
+            models.Index(
+                fields=["id"],
+                condition=models.Q(is_active=True),
+                name="phone_active_idx",
+            ),
         ]
 
     def __str__(self):
@@ -54,7 +62,13 @@ class CreditRequest(BaseTransaction):
         db_table = "credit_requests"
         indexes = [
             models.Index(fields=["user", "created_at"]),
-            models.Index(fields=["status"]),
+            # Serves the validation sums, globally and per user, as
+            # index-only scans over just the rows they add up.
+            models.Index(
+                fields=["user", "amount"],
+                condition=models.Q(status="APPROVED", processed=True),
+                name="cr_approved_user_amount_idx",
+            ),
         ]
 
     def __str__(self):
@@ -74,7 +88,13 @@ class ChargeSale(BaseTransaction):
         indexes = [
             models.Index(fields=["user", "created_at"]),
             models.Index(fields=["phone_number"]),
-            models.Index(fields=["status"]),
+            # Serves the validation sums, globally and per user, as
+            # index-only scans over just the rows they add up.
+            models.Index(
+                fields=["user", "amount"],
+                condition=models.Q(status="APPROVED", processed=True),
+                name="cs_approved_user_amount_idx",
+            ),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from tbdl.charge.cache import forget_active_phones
+from tbdl.charge.cache import forget_token
+from tbdl.charge.cache import forget_user
+from tbdl.charge.models import PhoneNumber
+from tbdl.users.models import User
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def evict_saved_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=PhoneNumber)
+@receiver(post_delete, sender=PhoneNumber)
+def evict_active_phones(sender, instance, **kwargs):
+    forget_active_phones()
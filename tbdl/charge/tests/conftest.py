@@ -0,0 +1,17 @@
+import pytest
+from rest_framework.authtoken.models import Token
+
+from tbdl.charge.cache import _auth_cache
+from tbdl.users.models import User
+
+
+@pytest.fixture(autouse=True)
+def _clear_auth_cache():
+    _auth_cache.clear()
+    yield
+    _auth_cache.clear()
+
+
+@pytest.fixture
+def token(user: User) -> Token:
+    return Token.objects.create(user=user)
@@ -0,0 +1,24 @@
+from factory import Faker
+from factory import Sequence
+from factory import SubFactory
+from factory.django import DjangoModelFactory
+
+from tbdl.charge.models import CreditRequest
+from tbdl.charge.models import PhoneNumber
+from tbdl.users.tests.factories import UserFactory
+
+
+class PhoneNumberFactory(DjangoModelFactory[PhoneNumber]):
+    number = Sequence(lambda n: f"0912{n:07d}")
+    title = Faker("word")
+
+    class Meta:
+        model = PhoneNumber
+
+
+class CreditRequestFactory(DjangoModelFactory[CreditRequest]):
+    user = SubFactory(UserFactory)
+    amount = 1000
+
+    class Meta:
+        model = CreditRequest
@@ -0,0 +1,80 @@
+from http import HTTPStatus
+
+import pytest
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from tbdl.charge.tests.factories import CreditRequestFactory
+from tbdl.users.models import User
+from tbdl.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+# The ninja and DRF approve endpoints must behave the same.
+APPROVE_ENDPOINTS = [
+    pytest.param("/api/charge/credit-requests/{}/approve", "Bearer", id="ninja"),
+    pytest.param("/drf/credit/{}/approve/", "Token", id="drf"),
+]
+
+
+@pytest.mark.parametrize(("url", "scheme"), APPROVE_ENDPOINTS)
+class TestApproveCreditRequest:
+    def test_credits_the_owner_not_the_approver(
+        self,
+        client: Client,
+        user: User,
+        url: str,
+        scheme: str,
+    ):
+        approver = UserFactory()
+        token = Token.objects.create(user=approver)
+        credit_request = CreditRequestFactory(user=user, amount=300)
+
+        response = client.post(
+            url.format(credit_request.id),
+            headers={"Authorization": f"{scheme} {token.key}"},
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        body = response.json()
+        assert body["id"] == credit_request.id
+        assert body["amount"] == 300  # noqa: PLR2004
+        assert body["status"] == "APPROVED"
+        assert body["processed"] is True
+        user.refresh_from_db()
+        assert (user.credit, user.approved_credits_total) == (300, 300)
+        approver.refresh_from_db()
+        assert (approver.credit, approver.approved_credits_total) == (0, 0)
+
+    def test_second_approval_is_rejected(
+        self,
+        client: Client,
+        user: User,
+        token: Token,
+        url: str,
+        scheme: str,
+    ):
+        credit_request = CreditRequestFactory(user=user, amount=300)
+        headers = {"Authorization": f"{scheme} {token.key}"}
+
+        client.post(url.format(credit_request.id), headers=headers)
+        response = client.post(url.format(credit_request.id), headers=headers)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == {"detail": "Already processed"}
+        user.refresh_from_db()
+        assert (user.credit, user.approved_credits_total) == (300, 300)
+
+    def test_missing_request(
+        self,
+        client: Client,
+        token: Token,
+        url: str,
+        scheme: str,
+    ):
+        response = client.post(
+            url.format(999_999),
+            headers={"Authorization": f"{scheme} {token.key}"},
+        )
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,64 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from tbdl.charge.auth import CachedTokenAuthentication
+from tbdl.charge.cache import _auth_cache
+from tbdl.charge.cache import cached_token
+from tbdl.charge.cache import remember_token
+from tbdl.users.models import User
+
+
+def test_token_delete_evicts_cached_token(token: Token):
+    remember_token(token)
+    assert cached_token(token.key) is token
+
+    token.delete()
+
+    assert cached_token(token.key) is None
+
+
+def test_user_save_evicts_cached_tokens(user: User, token: Token):
+    remember_token(token)
+
+    user.is_active = False
+    user.save()
+
+    assert cached_token(token.key) is None
+
+
+def test_user_save_keeps_other_users_tokens(user: User, token: Token):
+    other_token = Token.objects.create(user=User.objects.create(username="other"))
+    remember_token(token)
+    remember_token(other_token)
+
+    user.save()
+
+    assert cached_token(token.key) is None
+    assert cached_token(other_token.key) is other_token
+
+
+def test_expired_tokens_leave_the_user_index(user: User, token: Token):
+    remember_token(token)
+
+    _auth_cache.expire(_auth_cache.timer() + _auth_cache.ttl)
+
+    assert user.id not in _auth_cache._keys_by_user  # noqa: SLF001
+
+
+class TestCachedTokenAuthentication:
+    def test_hit_returns_the_same_pair_as_a_miss(self, user: User, token: Token):
+        auth = CachedTokenAuthentication()
+
+        miss = auth.authenticate_credentials(token.key)
+        hit = auth.authenticate_credentials(token.key)
+
+        assert miss == hit == (user, token)
+
+    def test_hit_rejects_an_inactive_user(self, user: User, token: Token):
+        user.is_active = False
+        token.user = user
+        remember_token(token)
+
+        with pytest.raises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(token.key)
@@ -0,0 +1,38 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from tbdl.charge.models import CreditRequest
+from tbdl.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+class TestRepairUserTransactionTotals:
+    @pytest.fixture
+    def drifted_user(self, user: User) -> User:
+        # An approval recorded outside the API, as the admin would
+        CreditRequest.objects.create(
+            user=user,
+            amount=100,
+            status="APPROVED",
+            processed=True,
+        )
+        return user
+
+    def test_check_only_reports(self, drifted_user: User):
+        out = StringIO()
+
+        call_command("repair_user_transaction_totals", "--check", stdout=out)
+
+        assert f"User {drifted_user.id}: approved=100 sales=0" in out.getvalue()
+        drifted_user.refresh_from_db()
+        assert drifted_user.approved_credits_total == 0
+
+    def test_recomputes_the_totals(self, drifted_user: User):
+        call_command("repair_user_transaction_totals", stdout=StringIO())
+
+        drifted_user.refresh_from_db()
+        assert drifted_user.approved_credits_total == 100  # noqa: PLR2004
+        assert drifted_user.charge_sales_total == 0
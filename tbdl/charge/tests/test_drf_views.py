@@ -0,0 +1,146 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from tbdl.charge.cache import ACTIVE_PHONES_CACHE_KEY
+from tbdl.charge.cache import forget_active_phones
+from tbdl.charge.models import PhoneNumber
+from tbdl.charge.tests.factories import PhoneNumberFactory
+from tbdl.users.models import User
+from tbdl.users.tests.factories import UserFactory
+
+# REFRESH MATERIALIZED VIEW runs on a pool connection, so the data it reads
+# has to be committed.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+ACTIVE_PHONES_URL = "/drf/phone/active/"
+REFRESH_URL = "/drf/charge/refresh_validation/"
+VALIDATE_ALL_URL = "/drf/charge/validate_all/"
+
+
+@pytest.fixture
+def staff_token() -> Token:
+    return Token.objects.create(user=UserFactory(is_staff=True))
+
+
+class TestRefreshValidation:
+    def test_requires_staff(self, client: Client, token: Token):
+        response = client.post(
+            REFRESH_URL,
+            headers={"Authorization": f"Token {token.key}"},
+        )
+
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+    def test_requires_authentication(self, client: Client):
+        response = client.post(REFRESH_URL)
+
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+    def test_staff_refreshes_the_snapshot(self, client: Client, staff_token: Token):
+        User.objects.filter(id=staff_token.user_id).update(credit=70)
+
+        response = client.post(
+            REFRESH_URL,
+            headers={"Authorization": f"Token {staff_token.key}"},
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        body = response.json()
+        assert body["current_user_credits"] == 70  # noqa: PLR2004
+        assert body["refreshed_at"]
+
+
+class TestValidateAll:
+    def test_serves_the_snapshot_without_refreshing(
+        self,
+        client: Client,
+        staff_token: Token,
+    ):
+        headers = {"Authorization": f"Token {staff_token.key}"}
+        refreshed = client.post(REFRESH_URL, headers=headers).json()
+        User.objects.filter(id=staff_token.user_id).update(credit=70)
+
+        response = client.get(VALIDATE_ALL_URL, headers=headers)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == refreshed
+
+
+class TestValidateUser:
+    def test_reads_the_running_totals(self, client: Client, user: User, token: Token):
+        User.objects.filter(id=user.id).update(
+            credit=70,
+            approved_credits_total=100,
+            charge_sales_total=30,
+        )
+
+        response = client.get(
+            f"/drf/charge/validate/{user.id}/",
+            headers={"Authorization": f"Token {token.key}"},
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            "total_approved_credits": 100,
+            "current_user_credits": 70,
+            "total_spent_credits": 30,
+            "total_charge_sales": 30,
+            "is_consistent": True,
+            "details": "All transactions are consistent",
+        }
+
+
+class TestActivePhoneNumbers:
+    @pytest.fixture(autouse=True)
+    def _empty_cache(self):
+        forget_active_phones()
+        yield
+        forget_active_phones()
+
+    def test_serves_the_cached_rows(self, client: Client, token: Token):
+        headers = {"Authorization": f"Token {token.key}"}
+        phone = PhoneNumberFactory()
+        first = client.get(ACTIVE_PHONES_URL, headers=headers).json()
+
+        # A queryset update sends no signal, so the cache is not dropped
+        PhoneNumber.objects.filter(id=phone.id).update(title="changed")
+        second = client.get(ACTIVE_PHONES_URL, headers=headers).json()
+
+        assert first == second
+        assert [row["id"] for row in second] == [phone.id]
+
+    def test_save_invalidates_the_cache(self, client: Client, token: Token):
+        headers = {"Authorization": f"Token {token.key}"}
+        phone = PhoneNumberFactory()
+        client.get(ACTIVE_PHONES_URL, headers=headers)
+
+        phone.is_active = False
+        phone.save()
+
+        assert client.get(ACTIVE_PHONES_URL, headers=headers).json() == []
+
+    def test_forget_active_phones_drops_the_entry(
+        self,
+        client: Client,
+        token: Token,
+    ):
+        PhoneNumberFactory()
+        client.get(ACTIVE_PHONES_URL, headers={"Authorization": f"Token {token.key}"})
+        assert cache.get(ACTIVE_PHONES_CACHE_KEY) is not None
+
+        forget_active_phones()
+
+        assert cache.get(ACTIVE_PHONES_CACHE_KEY) is None
+
+    def test_browsable_api(self, client: Client, token: Token):
+        response = client.get(
+            ACTIVE_PHONES_URL,
+            headers={"Authorization": f"Token {token.key}", "Accept": "text/html"},
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response["Content-Type"].startswith("text/html")
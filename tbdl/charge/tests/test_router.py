@@ -0,0 +1,185 @@
+from datetime import datetime
+from http import HTTPStatus
+
+import msgspec
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from tbdl.charge.models import ChargeSale
+from tbdl.charge.models import CreditRequest
+from tbdl.charge.tests.factories import PhoneNumberFactory
+from tbdl.users.models import User
+
+# The write helpers run on their own pool connections, which only see
+# committed rows.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+BULK_URL = "/api/charge/charge-sales/bulk"
+
+
+class TestCreateChargeSalesBulk:
+    @pytest.fixture
+    def phones(self):
+        return PhoneNumberFactory(), PhoneNumberFactory()
+
+    def post(self, client: Client, token: Token, items):
+        return client.post(
+            BULK_URL,
+            items,
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {token.key}"},
+        )
+
+    def test_debits_once_and_tops_up_each_phone(
+        self,
+        client: Client,
+        user: User,
+        token: Token,
+        phones,
+    ):
+        User.objects.filter(id=user.id).update(credit=100)
+        first, second = phones
+
+        response = self.post(
+            client,
+            token,
+            [
+                {"amount": 10, "phone_number_id": first.id},
+                {"amount": 20, "phone_number_id": second.id},
+                {"amount": 5, "phone_number_id": first.id},
+            ],
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert [sale["amount"] for sale in response.json()] == [10, 20, 5]
+        user.refresh_from_db()
+        assert (user.credit, user.charge_sales_total) == (65, 35)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.current_charge, second.current_charge) == (15, 20)
+
+    def test_accepts_the_batch_limit(
+        self,
+        client: Client,
+        user: User,
+        token: Token,
+        phones,
+    ):
+        User.objects.filter(id=user.id).update(credit=500)
+
+        response = self.post(
+            client,
+            token,
+            [{"amount": 1, "phone_number_id": phones[0].id}] * 500,
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert ChargeSale.objects.count() == 500  # noqa: PLR2004
+
+    @pytest.mark.parametrize(
+        ("build_items", "detail"),
+        [
+            pytest.param(
+                lambda first, second: [
+                    {"amount": 60, "phone_number_id": first.id},
+                    {"amount": 50, "phone_number_id": second.id},
+                ],
+                "Insufficient credit",
+                id="short-balance",
+            ),
+            pytest.param(
+                lambda first, second: [
+                    {"amount": 1, "phone_number_id": first.id},
+                    {"amount": 1, "phone_number_id": second.id + 1000},
+                ],
+                "Phone number not found",
+                id="unknown-phone",
+            ),
+            pytest.param(
+                lambda first, second: [{"amount": 1, "phone_number_id": first.id}]
+                * 501,
+                "Send between 1 and 500 charge sales",
+                id="over-limit",
+            ),
+            pytest.param(
+                lambda first, second: [],
+                "Send between 1 and 500 charge sales",
+                id="empty",
+            ),
+        ],
+    )
+    def test_rejects_the_whole_batch(  # noqa: PLR0913
+        self,
+        client: Client,
+        user: User,
+        token: Token,
+        phones,
+        build_items,
+        detail,
+    ):
+        User.objects.filter(id=user.id).update(credit=100)
+        first, second = phones
+
+        response = self.post(client, token, build_items(first, second))
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == {"detail": detail}
+        user.refresh_from_db()
+        assert (user.credit, user.charge_sales_total) == (100, 0)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.current_charge, second.current_charge) == (0, 0)
+        assert not ChargeSale.objects.exists()
+
+
+async def _drain(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+class TestListCreditRequests:
+    url = "/api/charge/credit-requests"
+
+    def expected(self, user: User):
+        return list(
+            CreditRequest.objects.filter(user=user)
+            .order_by("id")
+            .values("id", "amount", "status", "processed", "created_at"),
+        )
+
+    def body(self, response):
+        content = (
+            async_to_sync(_drain)(response.streaming_content)
+            if response.streaming
+            else response.content
+        )
+        rows = msgspec.json.decode(content)
+        for row in rows:
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+        return sorted(rows, key=lambda row: row["id"])
+
+    @pytest.mark.parametrize(
+        ("count", "streamed"),
+        [(0, False), (3, False), (500, False), (501, True), (1200, True)],
+    )
+    def test_returns_the_whole_history(
+        self,
+        client: Client,
+        user: User,
+        token: Token,
+        count,
+        streamed,
+    ):
+        CreditRequest.objects.bulk_create(
+            CreditRequest(user=user, amount=amount + 1) for amount in range(count)
+        )
+
+        response = client.get(
+            self.url,
+            headers={"Authorization": f"Bearer {token.key}"},
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming is streamed
+        assert self.body(response) == self.expected(user)
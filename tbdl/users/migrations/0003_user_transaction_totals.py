@@ -0,0 +1,54 @@
+# Generated by Django 5.0.9 on 2026-10-15 06:37
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def _approved_total(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                user_id=OuterRef("pk"),
+                status="APPROVED",
+                processed=True,
+            )
+            .values("user_id")
+            .annotate(total=Sum("amount"))
+            .values("total"),
+        ),
+        0,
+    )
+
+
+def backfill_transaction_totals(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    CreditRequest = apps.get_model("charge", "CreditRequest")
+    ChargeSale = apps.get_model("charge", "ChargeSale")
+    User.objects.update(
+        approved_credits_total=_approved_total(CreditRequest),
+        charge_sales_total=_approved_total(ChargeSale),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_credit'),
+        ('charge', '0005_chargesale_cs_approved_user_amount_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='approved_credits_total',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Approved credits total'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='charge_sales_total',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Charge sales total'),
+        ),
+        migrations.RunPython(backfill_transaction_totals, migrations.RunPython.noop),
+    ]
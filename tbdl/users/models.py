@@ -19,6 +19,18 @@ class User(AbstractUser):
         default=0,
         validators=[MinValueValidator(0)],
     )
+    # Running totals kept in the same UPDATE as credit, so per-user validation
+    # reads one row instead of aggregating the transaction history.
+    approved_credits_total = IntegerField(
+        _("Approved credits total"),
+        default=0,
+        validators=[MinValueValidator(0)],
+    )
+    charge_sales_total = IntegerField(
+        _("Charge sales total"),
+        default=0,
+        validators=[MinValueValidator(0)],
+    )
     # First and last name do not cover name patterns around the globe
     name = CharField(_("Name of User"), blank=True, max_length=255)
     first_name = None  # type: ignore[assignment]
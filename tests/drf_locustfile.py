@@ -1,75 +1,181 @@
+"""Load test for the DRF charge API.
+
+Run it against the stack as compose starts it (``/start``): gunicorn with
+``2 * nproc + 1`` uvicorn workers and 65s keep-alive. The views are async, so
+the workers are ASGI rather than gevent; ``runserver`` is a single process and
+caps throughput long before the API does.
+
+Users are gevent greenlets on geventhttpclient (FastHttpUser), locust's own
+async I/O model; an asyncio harness would mean leaving locust and its stats,
+so the tasks stay plain functions.
+
+    locust -f tests/drf_locustfile.py --host http://localhost:8000
+"""
+
+import contextlib
 import random
+import sys
+import time
 
-from locust import HttpUser
-from locust import between
+import msgspec
+from gevent.lock import Semaphore
+from locust import constant
 from locust import events
 from locust import task
-
-
-class DRFSellerUser(HttpUser):
-    wait_time = between(0.1, 0.5)
+from locust.contrib.fasthttp import FastHttpSession
+from locust.contrib.fasthttp import FastHttpUser
+from locust.exception import StopUser
+
+PHONES_TTL = 30
+
+# Sale amounts drawn once at import; users walk the pool from random offsets
+# instead of calling random.randint() per sale.
+_POOL_MASK = 4095
+_SALE_AMOUNTS = [random.randint(1000, 5000) for _ in range(_POOL_MASK + 1)]
+
+# Fixed-shape bodies, formatted straight to bytes instead of through json=.
+# They rely on the Content-Type: application/json in each user's headers.
+_CREDIT_TMPL = b'{"amount":%d}'
+_SALE_TMPL = b'{"amount":%d,"phone_number_id":%d}'
+
+# One approved credit per username, created by whichever user starts first,
+# instead of a create-and-approve pair per user. It covers the most any run
+# can spend: 10 sales of at most 5000 each for up to 1000 users.
+_BOOTSTRAP_CREDIT = 10 * 5000 * 1000
+_credit_pool_lock = Semaphore()
+_credit_pool_ready = {"root": False, "root1": False}
+
+# Every user logs in as root or root1, so one token per username serves the
+# whole run and the stop hook instead of a login per user. The request headers
+# are built once per username too and shared read-only by its users.
+_headers_cache = {}
+_headers_lock = Semaphore()
+
+
+def auth_headers(client, username):
+    with _headers_lock:
+        headers = _headers_cache.get(username)
+        if headers is None:
+            response = client.post(
+                "/drf/auth-token/",
+                json={"username": username, "password": username},
+            )
+            if response.status_code != 200:
+                return None
+            token = msgspec.json.decode(response.content)["token"]
+            headers = _headers_cache[username] = {
+                "Authorization": f"Token {token}",  # DRF uses Token instead of Bearer
+                "Content-Type": "application/json",
+            }
+        return headers
+
+
+class DRFSellerUser(FastHttpUser):
+    # The mean of the old between(0.1, 0.5), without a random draw per task.
+    # Like that wait it starts after the task's requests return, so the offered
+    # load, 1 / (0.3s + latency) tasks/s per user, stays comparable with
+    # earlier runs; constant_throughput() would raise it as latency falls.
+    wait_time = constant(0.3)
+    connection_timeout = 10.0
+    network_timeout = 30.0
+    # Tasks run one request at a time, so a single kept-alive connection per
+    # user is reused for every call; the SUT holds it open (--keep-alive 65).
+    concurrency = 1
+    # Certificate checks are configured once on the client rather than per call.
+    insecure = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.username = "root"
         self.charge_sales_made = 0
+        self._draw = random.randrange(_POOL_MASK + 1)
+        # Round-robin over the phone list from a random start, so users don't
+        # all top up the same phone row at once.
+        self._phone_cycle = random.randrange(_POOL_MASK + 1)
+        self._phones = None
+        self._phones_fetched_at = 0
 
     def on_start(self):
+        # Open this user's connection before any measured request. HEAD on the
+        # token endpoint is a cheap 405 with no database work. It goes through
+        # the session's user agent directly, which shares the connection pool
+        # but fires no request event, so it never lands in the stats. The 405
+        # raises after the connection is returned to the pool; ignore it.
+        with contextlib.suppress(Exception):
+            self.client.client.urlopen(
+                f"{self.client.base_url}/drf/auth-token/",
+                method="HEAD",
+            )
+
         # Assign alternating usernames to distribute load
         self.username = random.choice(["root", "root1"])
-        self.password = self.username
 
-        # Get auth token
-        response = self.client.post(
-            "/drf/auth-token/",
-            json={"username": self.username, "password": self.password},
-        )
-
-        if response.status_code != 200:
+        self.headers = auth_headers(self.client, self.username)
+        if self.headers is None:
             raise Exception(f"Failed to authenticate {self.username}")
 
-        token = response.json()["token"]
-        self.client.headers.update(
-            {
-                "Authorization": f"Token {token}",  # DRF uses Token instead of Bearer
-                "Content-Type": "application/json",
-            }
-        )
+        with _credit_pool_lock:
+            if not _credit_pool_ready[self.username]:
+                _credit_pool_ready[self.username] = self.bootstrap_credit()
 
-        # Create initial credit request
-        amount = random.randint(1000000, 2000000)
+    def bootstrap_credit(self):
+        # Two round trips, but only once per username per run. The approve URL
+        # needs the id the create returns, so the pair can't be pipelined.
         response = self.client.post(
-            "/drf/credit/", 
-            json={"amount": amount}
+            "/drf/credit/",
+            data=_CREDIT_TMPL % _BOOTSTRAP_CREDIT,
+            headers=self.headers,
         )
+        if response.status_code != 201:
+            return False
 
-        if response.status_code == 201:  # DRF returns 201 for created
-            request_id = response.json()["id"]
-            self.client.post(f"/drf/credit/{request_id}/approve/")
+        request_id = msgspec.json.decode(response.content)["id"]
+        response = self.client.post(
+            f"/drf/credit/{request_id}/approve/",
+            name="/drf/credit/[id]/approve/",
+            headers=self.headers,
+        )
+        return response.status_code == 200
+
+    def phone_numbers(self):
+        # The phone list barely changes during a run; refetch it every PHONES_TTL
+        # seconds rather than once per sale so the run measures the write path.
+        if (
+            self._phones is None
+            or time.monotonic() - self._phones_fetched_at > PHONES_TTL
+        ):
+            response = self.client.get(
+                "/drf/phone/active/",
+                headers=self.headers,
+            )
+            if response.status_code != 200:
+                return None
+            self._phones = msgspec.json.decode(response.content)
+            self._phones_fetched_at = time.monotonic()
+        return self._phones
 
     @task
     def charge_sale(self):
         if self.charge_sales_made >= 10:
-            return
-
-        phones_response = self.client.get("/drf/phone/active/")
-        if phones_response.status_code == 200:
-            phones = phones_response.json()
-            if phones:
-                phone = random.choice(phones)
-                amount = random.randint(1000, 5000)
-
-                response = self.client.post(
-                    "/drf/charge/",
-                    json={
-                        "amount": amount,
-                        "phone_number_id": phone["id"],
-                    },
-                    verify=False,
-                )
+            # Done: stop this user instead of waking it every wait_time to
+            # return straight away.
+            raise StopUser
+
+        phones = self.phone_numbers()
+        if phones:
+            phone = phones[self._phone_cycle % len(phones)]
+            self._phone_cycle += 1
+            amount = _SALE_AMOUNTS[self._draw & _POOL_MASK]
+            self._draw += 1
+
+            response = self.client.post(
+                "/drf/charge/",
+                data=_SALE_TMPL % (amount, phone["id"]),
+                headers=self.headers,
+            )
 
-                if response.status_code == 201:  # DRF returns 201 for created
-                    self.charge_sales_made += 1
+            if response.status_code == 201:  # DRF returns 201 for created
+                self.charge_sales_made += 1
 
 
 @events.test_stop.add_listener
@@ -80,35 +186,41 @@ def on_test_stop(environment, **kwargs):
 
     print("\n=== Test Summary ===")
     try:
-        test_user = environment.runner.user_classes[0](environment)
-
-        # Authenticate
-        credentials = {
-            "username": "root",
-            "password": "root",
-        }
-        auth_response = test_user.client.post("/drf/auth-token/", json=credentials)
+        # A bare session: no user class to instantiate, no lifecycle hooks.
+        client = FastHttpSession(environment, base_url=environment.host, user=None)
 
-        if auth_response.status_code != 200:
-            print(f"Failed to authenticate: {auth_response.text}")
+        headers = auth_headers(client, "root")
+        if headers is None:
+            print("Failed to authenticate root")
             return
 
-        token = auth_response.json()["token"]
-        test_user.client.headers = {"Authorization": f"Token {token}"}
-
-        # Make validation request using DRF endpoint
-        response = test_user.client.get("/drf/charge/validate_all/")
+        # validate_all reads a snapshot; refresh it (admin only) so the report
+        # covers this run exactly. Otherwise the report is as old as its
+        # refreshed_at, which is printed below.
+        response = client.post(
+            "/drf/charge/refresh_validation/",
+            headers=headers,
+        )
+        if response.status_code != 200:
+            response = client.get(
+                "/drf/charge/validate_all/",
+                headers=headers,
+            )
 
         if response.status_code == 200:
-            results = response.json()
-            print("Validation Results:")
-            print(f"Total approved credits: {results['total_approved_credits']}")
-            print(f"Current user credits: {results['current_user_credits']}")
-            print(f"Total spent credits: {results['total_spent_credits']}")
-            print(f"Total charge sales: {results['total_charge_sales']}")
-            print(
-                f"Consistency check: {'PASSED' if results['is_consistent'] else 'FAILED'}"
+            results = msgspec.json.decode(response.content)
+            consistency = "PASSED" if results["is_consistent"] else "FAILED"
+            # One write for the whole report rather than a print() per line.
+            sys.stdout.write(
+                "Validation Results:\n"
+                f"Total approved credits: {results['total_approved_credits']}\n"
+                f"Current user credits: {results['current_user_credits']}\n"
+                f"Total spent credits: {results['total_spent_credits']}\n"
+                f"Total charge sales: {results['total_charge_sales']}\n"
+                f"Consistency check: {consistency}\n"
+                f"Details: {results['details']}\n"
+                f"Snapshot taken at: {results['refreshed_at']}\n",
             )
-            print(f"Details: {results['details']}")
+            sys.stdout.flush()
     except Exception as e:
         print(f"Failed to get validation results: {e}")